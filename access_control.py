@@ -7,20 +7,29 @@
 import streamlit as st
 import socket
 
+# 本地IP
+LOCAL_IPS = frozenset(("127.0.0.1", "localhost", "::1", "0.0.0.0"))
+# IPv6本地地址前缀
+LOCAL_IPV6_PREFIXES = ("fe80:", "::1")
+
 
 def get_client_ip():
     """
     尝试获取客户端IP地址
+    同一会话内IP不变，首次获取成功后缓存在 session_state 中
 
     Returns:
         str: 客户端IP地址，无法获取时返回"unknown"
     """
     try:
+        if "_client_ip" in st.session_state:
+            return st.session_state["_client_ip"]
+
         client_ip = st.context.ip_address
         if client_ip is None:
-            return "127.0.0.1"
-        else:
-            return client_ip
+            client_ip = "127.0.0.1"
+        st.session_state["_client_ip"] = client_ip
+        return client_ip
 
     except Exception as e:
         # st.error(f"获取客户端IP时发生错误: {e}")
@@ -39,21 +48,25 @@ def is_local_access():
     """
     client_ip = get_client_ip()
 
-    # 无法获取IP，默认不允许
+    # 无法获取IP，默认不允许（不缓存，下次重跑时再试）
     if client_ip == "unknown" or not client_ip:
         return False
 
-    # 本地IP
-    local_ips = ["127.0.0.1", "localhost", "::1", "0.0.0.0"]
-    if client_ip in local_ips:
-        return True
+    cached = st.session_state.get("_is_local")
+    if cached is not None and cached[0] == client_ip:
+        return cached[1]
 
+    if client_ip in LOCAL_IPS:
+        is_local = True
     # 检查是否为IPv6本地地址
-    if client_ip.startswith("fe80:") or client_ip.startswith("::1"):
-        return True
-
+    elif client_ip.startswith(LOCAL_IPV6_PREFIXES):
+        is_local = True
     # 其他情况视为远程访问
-    return False
+    else:
+        is_local = False
+
+    st.session_state["_is_local"] = (client_ip, is_local)
+    return is_local
 
 
 def check_admin_access(page_name="此页面"):
@@ -17,28 +17,26 @@ import os
 import re
 import sys
 import io
+from typing import BinaryIO, Union
+from functools import lru_cache
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import Paragraph, Frame
+from reportlab.platypus import Paragraph
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_LEFT
 
-# Optional imports for preview generation
-try:
-    import fitz  # PyMuPDF
-    from PIL import Image
-    HAS_PREVIEW_SUPPORT = True
-except ImportError:
-    HAS_PREVIEW_SUPPORT = False
-
 # --------------------------- Font setup ---------------------------
 
+@lru_cache(maxsize=1)
 def register_simsun_from_local():
-    """Register SimSun from a local 'simsun.ttc' placed next to this script."""
+    """
+    Register SimSun from a local 'simsun.ttc' placed next to this script.
+    Cached: repeat calls return the registered name without touching the disk.
+    """
     base_dir = os.path.dirname(os.path.abspath(__file__))
     simsun_path = os.path.join(base_dir, "simsun.ttc")
     if os.path.isfile(simsun_path):
@@ -59,35 +57,71 @@ EN_FONT_BOLD = "Times-Bold" # built-in
 
 # --------------------------- Mixed-text helpers ---------------------------
 
-ASCII = set(range(32, 127))
+# Printable-ASCII runs vs. everything else
+_RUN_RE = re.compile(r'[ -~]+|[^\x20-\x7E]+')
 
-def split_runs(s: str):
-    """Split s into ASCII and non-ASCII runs (keeps order)."""
-    return re.findall(r'[ -~]+|[^\x20-\x7E]+', s)
+@lru_cache(maxsize=4096)
+def split_runs(s: str) -> tuple:
+    """
+    Split s into ASCII and non-ASCII runs (keeps order).
+    Cached: headers and items repeat across previews/reruns.
+    """
+    return tuple(_RUN_RE.findall(s))
 
+@lru_cache(maxsize=4096)
 def wrap_mixed(s: str, en_font: str = EN_FONT, zh_font: str = ZH_FONT) -> str:
     """
     Wrap ASCII runs with <font name='en_font'>, others with <font name='zh_font'>,
     so a Paragraph may render mixed fonts correctly.
     """
-    parts = []
-    for tok in split_runs(s):
-        if tok and all(ord(ch) in ASCII for ch in tok):
-            parts.append(f"<font name='{en_font}'>{tok}</font>")
-        else:
-            parts.append(f"<font name='{zh_font}'>{tok}</font>")
-    return "".join(parts)
+    en_open = f"<font name='{en_font}'>"
+    zh_open = f"<font name='{zh_font}'>"
+    # isascii() + isprintable() == every char in 0x20..0x7E
+    return "".join(
+        (en_open if tok.isascii() and tok.isprintable() else zh_open) + tok + "</font>"
+        for tok in split_runs(s)
+    )
+
+# font name -> {char: advance width at 1pt}; filled lazily, one
+# pdfmetrics lookup per distinct character
+_WIDTH_CACHE = {}
+
+def _char_widths(font: str) -> dict:
+    """Per-character width table for font, pre-seeded with printable ASCII."""
+    table = _WIDTH_CACHE.get(font)
+    if table is None:
+        table = {chr(i): pdfmetrics.stringWidth(chr(i), font, 1.0) for i in range(32, 127)}
+        _WIDTH_CACHE[font] = table
+    return table
+
+@lru_cache(maxsize=4096)
+def _string_width(text: str, font: str, size: float) -> float:
+    """
+    Width of text in font at size, summed from the per-character table
+    (same as pdfmetrics.stringWidth: no kerning in either font type).
+    Fonts are registered once at import; if a font name is ever
+    re-registered, clear _WIDTH_CACHE and call _string_width.cache_clear().
+    """
+    table = _char_widths(font)
+    total = 0.0
+    for ch in text:
+        w = table.get(ch)
+        if w is None:
+            w = table[ch] = pdfmetrics.stringWidth(ch, font, 1.0)
+        total += w
+    return total * size
 
 def string_width_mixed(s: str, en_font: str = EN_FONT, zh_font: str = ZH_FONT, size: float = 11) -> float:
     """Measure width of mixed string by summing run widths with the given fonts."""
     width = 0.0
     for tok in split_runs(s):
-        font = en_font if (tok and all(ord(ch) in ASCII for ch in tok)) else zh_font
-        width += pdfmetrics.stringWidth(tok, font, size)
+        font = en_font if (tok.isascii() and tok.isprintable()) else zh_font
+        width += _string_width(tok, font, size)
     return width
 
 # --------------------------- Header builder ---------------------------
 
+@lru_cache(maxsize=128)
 def build_header_one_line(date_str: str, scope: str, max_width: float, font_size: float = 11,
                           en_font_for_width: str = EN_FONT_BOLD, zh_font_for_width: str = ZH_FONT) -> str:
     """
@@ -97,77 +131,81 @@ def build_header_one_line(date_str: str, scope: str, max_width: float, font_size
     Target format:
         "{date} {scope} Name________ Class___"
 
+    Cached: the header is the same for the preview and the download build.
+
     Strategy:
-        reduce underline lengths (Name/Class) until fits; if needed, remove
-        the space before 'Class' as last resort.
+        shorten the underlines (Name first, then Class) to the longest that
+        fits; if needed, remove the space before 'Class' as last resort.
     """
-    # Start with reasonably long underlines
-    name_us = "________"
-    class_us = "___"
-    # Minimal underline lengths to keep visible lines
-    min_name = "__"
-    min_class = "_"
-
-    def assemble(nu: str, cu: str, tight: bool = False) -> str:
-        if tight:
-            return f"{date_str} {scope} Name{nu}Class{cu}"
-        return f"{date_str} {scope} Name{nu} Class{cu}"
+    # Start with reasonably long underlines; keep at least a short visible line
+    name_max, class_max = 8, 3
+    name_min, class_min = 2, 1
 
-    nu, cu = name_us, class_us
-    header = assemble(nu, cu)
+    # Widths are additive per character, so the widest header that fits is
+    # closed-form: measure the fixed parts once and divide the leftover
+    # space by width("_").
+    prefix_w = string_width_mixed(f"{date_str} {scope} Name", en_font_for_width, zh_font_for_width, font_size)
+    class_w = string_width_mixed(" Class", en_font_for_width, zh_font_for_width, font_size)
+    underscore_w = _string_width("_", en_font_for_width, font_size)
 
     # Slight safety margin to account for rendering quirks when bolding
     safety = 1.0 * mm
-    while string_width_mixed(header, en_font_for_width, zh_font_for_width, font_size) > (max_width - safety):
-        if len(nu) > len(min_name):
-            nu = nu[:-1]
-        elif len(cu) > len(min_class):
-            cu = cu[:-1]
-        else:
-            # last resort: remove the space before "Class"
-            header = assemble(nu, cu, tight=True)
-            break
-        header = assemble(nu, cu)
-    return header
+    budget = max_width - safety - prefix_w - class_w
+    total = min(name_max + class_max, max(int(budget // underscore_w), 0))
+    if total < name_min + class_min:
+        # last resort: remove the space before "Class"
+        return f"{date_str} {scope} Name{'_' * name_min}Class{'_' * class_min}"
 
-# --------------------------- PDF generator ---------------------------
+    # Shrink the Name underline first, then the Class underline
+    nu = min(name_max, total - class_max) if total >= name_min + class_max else name_min
+    cu = total - nu
+    return f"{date_str} {scope} Name{'_' * nu} Class{'_' * cu}"
 
-def make_chongmo_pdf(date_str: str, scope: str, items: list, output_path: str,
-                     cols: int = 2, rows: int = 3, font_size: float = 11, padding: float = 3) -> str:
-    """
-    Generate a compact A4 worksheet:
-    - Flexible grid (default 2 x 3)
-    - NO gutters between rows/columns
-    - Small outer margin and inner padding
-    - Customizable font size (default 11pt)
-    - Bold, single-line header in each cell
+# --------------------------- Cell layout ---------------------------
 
-    Args:
-        date_str: Date string for header
-        scope: Scope string for header
-        items: List of items to display (any number)
-        output_path: Path to save the PDF
-        cols: Number of columns (default 2)
-        rows: Number of rows (default 3)
-        font_size: Font size in points (default 11)
-        padding: Cell inner padding in mm (default 3)
+# Inner padding (pt) a platypus Frame applies on every side by default
+# (leftPadding/rightPadding/topPadding/bottomPadding=6); kept so text sits
+# exactly where Frame.addFromList used to put it.
+FRAME_PADDING = 6
+
+# Overflow tolerance (pt), the same value reportlab's Frame uses
+LAYOUT_FUZZ = 1e-6
+
+def layout_flowables(flows: list, avail_w: float, avail_h: float) -> list:
     """
-    if len(items) == 0:
-        raise ValueError("Need at least 1 item.")
+    Wrap flowables once and stack them top-down the way Frame.addFromList does.
 
-    PAGE_W, PAGE_H = A4
-    margin = 8 * mm    # outer margin
-    pad = padding * mm       # inner padding (per cell)
+    This mirrors Frame._add for plain flowables: wrap against the remaining
+    height, reject the flowable if it overflows by more than LAYOUT_FUZZ, then
+    move down by its height plus spaceAfter. spaceBefore is not modelled
+    (the worksheet styles leave it at 0).
 
-    # No gutters between columns/rows
-    cell_w = (PAGE_W - 2 * margin) / cols
-    cell_h = (PAGE_H - 2 * margin) / rows
+    Returns:
+        list of (flowable, offset): offset is the distance from the top of the
+        available area down to the flowable's baseline origin. Stops at the
+        first flowable that no longer fits (no splitting, like Frame).
+    """
+    placed = []
+    used = 0.0
+    for f in flows:
+        if avail_h - used <= 0:
+            break
+        _, h = f.wrap(avail_w, avail_h - used)
+        if used + h > avail_h + LAYOUT_FUZZ:
+            break
+        placed.append((f, used + h))
+        used += h + f.getSpaceAfter()
+    return placed
 
-    # Typography
-    size = font_size
-    leading = size * 1.23  # Proportional leading
+# --------------------------- PDF generator ---------------------------
 
-    # Styles (header bold via markup; English in header uses Times-Bold explicitly)
+@lru_cache(maxsize=64)
+def _styles(size: float):
+    """
+    Header/body paragraph styles for a font size, built once and shared.
+    Header is bold via markup; English in header uses Times-Bold explicitly.
+    """
+    leading = size * 1.23  # Proportional leading
     header_style = ParagraphStyle(
         "hdr",
         fontName=ZH_FONT,   # base; actual runs are tagged inside
@@ -184,8 +222,29 @@ def make_chongmo_pdf(date_str: str, scope: str, items: list, output_path: str,
         spaceAfter=1,
         alignment=TA_LEFT,
     )
+    return header_style, body_style
 
-    c = canvas.Canvas(output_path, pagesize=A4)
+def _build_pdf(dst, date_str: str, scope: str, items: list,
+               cols: int, rows: int, font_size: float, padding: float) -> None:
+    """
+    Draw the worksheet page onto dst (a file path or a writable binary stream).
+    Shared by make_chongmo_pdf and generate_preview_image.
+    """
+    if len(items) == 0:
+        raise ValueError("Need at least 1 item.")
+
+    PAGE_W, PAGE_H = A4
+    margin = 8 * mm    # outer margin
+    pad = padding * mm       # inner padding (per cell)
+
+    # No gutters between columns/rows
+    cell_w = (PAGE_W - 2 * margin) / cols
+    cell_h = (PAGE_H - 2 * margin) / rows
+
+    size = font_size
+    header_style, body_style = _styles(size)
+
+    c = canvas.Canvas(dst, pagesize=A4, pageCompression=1)
 
     # Build bold header text that is guaranteed to fit one line
     inner_w = cell_w - 2 * pad
@@ -202,108 +261,83 @@ def make_chongmo_pdf(date_str: str, scope: str, items: list, output_path: str,
         line = f"{i}. {t}"
         flows.append(Paragraph(wrap_mixed(line, en_font=EN_FONT, zh_font=ZH_FONT), body_style))
 
-    # Draw 2x3 cells
-    for r in range(rows):
-        for col in range(cols):
-            x = margin + col * cell_w
-            y = PAGE_H - margin - (r + 1) * cell_h
-            c.rect(x, y, cell_w, cell_h, stroke=1, fill=0)
-            Frame(x + pad, y + pad, inner_w, cell_h - 2 * pad, showBoundary=0).addFromList(list(flows), c)
+    # Wrap once; every cell shows the same content
+    text_w = inner_w - 2 * FRAME_PADDING
+    placed = layout_flowables(flows, text_w, cell_h - 2 * pad - 2 * FRAME_PADDING)
+
+    # Lay the paragraphs out once as a form XObject in cell-local coordinates
+    c.beginForm("cell")
+    top = cell_h - pad - FRAME_PADDING
+    for f, offset in placed:
+        f.drawOn(c, pad + FRAME_PADDING, top - offset)
+    c.endForm()
+
+    # Cell origins, row by row (top row first)
+    xs = [margin + col * cell_w for col in range(cols)]
+    ys = [PAGE_H - margin - (r + 1) * cell_h for r in range(rows)]
+    origins = [(x, y) for y in ys for x in xs]
+
+    # All cell borders as one path, stroked once
+    borders = c.beginPath()
+    for x, y in origins:
+        borders.rect(x, y, cell_w, cell_h)
+    c.drawPath(borders, stroke=1, fill=0)
+
+    # Stamp the shared content into each 2x3 cell
+    for x, y in origins:
+        c.saveState()
+        c.translate(x, y)
+        c.doForm("cell")
+        c.restoreState()
 
     c.showPage()
     c.save()
-    return output_path
 
-# --------------------------- Preview generator ---------------------------
-
-def generate_preview_image(date_str: str, scope: str, items: list,
-                          cols: int = 2, rows: int = 3, font_size: float = 11,
-                          padding: float = 3, dpi: int = 150) -> bytes:
+def make_chongmo_pdf(date_str: str, scope: str, items: list, output_path: Union[str, BinaryIO],
+                     cols: int = 2, rows: int = 3, font_size: float = 11,
+                     padding: float = 3) -> Union[str, BinaryIO]:
     """
-    Generate a PNG preview image of the first page of the PDF.
+    Generate a compact A4 worksheet:
+    - Flexible grid (default 2 x 3)
+    - NO gutters between rows/columns
+    - Small outer margin and inner padding
+    - Customizable font size (default 11pt)
+    - Bold, single-line header in each cell
 
     Args:
-        date_str: Date string for the header
-        scope: Scope string for the header
-        items: List of items (any number)
+        date_str: Date string for header
+        scope: Scope string for header
+        items: List of items to display (any number)
+        output_path: Path to save the PDF, or a writable binary stream (e.g. BytesIO)
         cols: Number of columns (default 2)
         rows: Number of rows (default 3)
         font_size: Font size in points (default 11)
         padding: Cell inner padding in mm (default 3)
-        dpi: DPI for the preview image (default 150)
-
-    Returns:
-        bytes: PNG image data
-
-    Raises:
-        RuntimeError: If PyMuPDF or PIL is not available
-        ValueError: If items list is empty
     """
-    if not HAS_PREVIEW_SUPPORT:
-        raise RuntimeError("Preview generation requires PyMuPDF and Pillow. Please install: pip install PyMuPDF pillow")
-
-    if len(items) == 0:
-        raise ValueError("Need at least 1 item.")
-
-    # Generate PDF in memory
-    pdf_buffer = io.BytesIO()
-
-    # Temporarily generate PDF with in-memory buffer approach
-    # Since make_chongmo_pdf requires a file path, we'll use a different approach
-    PAGE_W, PAGE_H = A4
-    margin = 8 * mm
-    pad = padding * mm
-
-    cell_w = (PAGE_W - 2 * margin) / cols
-    cell_h = (PAGE_H - 2 * margin) / rows
-
-    size = font_size
-    leading = size * 1.23
-
-    header_style = ParagraphStyle(
-        "hdr",
-        fontName=ZH_FONT,
-        fontSize=size,
-        leading=leading,
-        spaceAfter=2,
-        alignment=TA_LEFT,
-    )
-    body_style = ParagraphStyle(
-        "body",
-        fontName=ZH_FONT,
-        fontSize=size,
-        leading=leading,
-        spaceAfter=1,
-        alignment=TA_LEFT,
-    )
-
-    c = canvas.Canvas(pdf_buffer, pagesize=A4)
+    _build_pdf(output_path, date_str, scope, items, cols, rows, font_size, padding)
+    return output_path
 
-    inner_w = cell_w - 2 * pad
-    header_plain = build_header_one_line(
-        date_str, scope, inner_w, font_size=size,
-        en_font_for_width=EN_FONT_BOLD, zh_font_for_width=ZH_FONT
-    )
-    header_rich = "<b>" + wrap_mixed(header_plain, en_font=EN_FONT_BOLD, zh_font=ZH_FONT) + "</b>"
+# --------------------------- Preview generator ---------------------------
 
-    flows = [Paragraph(header_rich, header_style)]
-    for i, t in enumerate(items, 1):
-        line = f"{i}. {t}"
-        flows.append(Paragraph(wrap_mixed(line, en_font=EN_FONT, zh_font=ZH_FONT), body_style))
+def pdf_to_preview_image(pdf_bytes: bytes, dpi: int = 96) -> bytes:
+    """
+    Render the first page of an in-memory PDF to PNG.
 
-    for r in range(rows):
-        for col in range(cols):
-            x = margin + col * cell_w
-            y = PAGE_H - margin - (r + 1) * cell_h
-            c.rect(x, y, cell_w, cell_h, stroke=1, fill=0)
-            Frame(x + pad, y + pad, inner_w, cell_h - 2 * pad, showBoundary=0).addFromList(list(flows), c)
+    Args:
+        pdf_bytes: PDF file content
+        dpi: DPI for the preview image (default 96)
 
-    c.showPage()
-    c.save()
+    Returns:
+        bytes: PNG image data
 
-    # Convert PDF to image
-    pdf_buffer.seek(0)
-    pdf_bytes = pdf_buffer.getvalue()
+    Raises:
+        RuntimeError: If PyMuPDF is not available
+    """
+    # Imported lazily: PyMuPDF is slow to import and only the preview needs it
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        raise RuntimeError("Preview generation requires PyMuPDF. Please install: pip install PyMuPDF")
 
     # Open with PyMuPDF
     pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
@@ -313,16 +347,39 @@ def generate_preview_image(date_str: str, scope: str, items: list,
     mat = fitz.Matrix(dpi / 72, dpi / 72)  # 72 is the default DPI
     pix = page.get_pixmap(matrix=mat)
 
-    # Convert to PIL Image and then to PNG bytes
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    # Encode PNG natively, no intermediate PIL image copy
+    png_bytes = pix.tobytes("png")
+    pdf_doc.close()
 
-    img_buffer = io.BytesIO()
-    img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
+    return png_bytes
 
-    pdf_doc.close()
+def generate_preview_image(date_str: str, scope: str, items: list,
+                          cols: int = 2, rows: int = 3, font_size: float = 11,
+                          padding: float = 3, dpi: int = 96) -> bytes:
+    """
+    Generate a PNG preview image of the first page of the PDF.
+
+    Args:
+        date_str: Date string for the header
+        scope: Scope string for the header
+        items: List of items (any number)
+        cols: Number of columns (default 2)
+        rows: Number of rows (default 3)
+        font_size: Font size in points (default 11)
+        padding: Cell inner padding in mm (default 3)
+        dpi: DPI for the preview image (default 96)
+
+    Returns:
+        bytes: PNG image data
 
-    return img_buffer.getvalue()
+    Raises:
+        RuntimeError: If PyMuPDF is not available
+        ValueError: If items list is empty
+    """
+    # Generate PDF in memory
+    pdf_buffer = io.BytesIO()
+    _build_pdf(pdf_buffer, date_str, scope, items, cols, rows, font_size, padding)
+    return pdf_to_preview_image(pdf_buffer.getvalue(), dpi=dpi)
 
 # --------------------------- Demo ---------------------------
 
@@ -2,11 +2,14 @@
 """
 日志管理工具模块
 支持自动轮转（单文件最大5MB）
+写文件在后台线程完成（QueueHandler/QueueListener），不阻塞页面
 """
 
 import os
+import atexit
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
 import json
 
@@ -21,11 +24,21 @@ MAX_LOG_SIZE = 5 * 1024 * 1024  # 5MB in bytes
 # 全局logger字典
 _loggers = {}
 
+# 后台写日志的监听器（退出时停止并刷盘）
+_listeners = []
+
+
+@atexit.register
+def _stop_listeners():
+    """进程退出前处理完队列中剩余的日志"""
+    while _listeners:
+        _listeners.pop().stop()
+
 
 def get_logger(name="app"):
     """
     获取logger实例
-    支持文件自动轮转（单文件5MB）
+    支持文件自动轮转（单文件5MB），文件写入在后台线程进行
 
     Args:
         name: logger名称
@@ -63,8 +76,14 @@ def get_logger(name="app"):
     )
     file_handler.setFormatter(formatter)
 
+    # logger只负责入队，由后台线程写入文件（含轮转时的重命名）
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, file_handler)
+    listener.start()
+    _listeners.append(listener)
+
     # 添加handler到logger
-    logger.addHandler(file_handler)
+    logger.addHandler(QueueHandler(log_queue))
 
     # 缓存logger
     _loggers[name] = logger
@@ -86,8 +105,8 @@ def log_pdf_generation(logger_name, generator_type, params):
     # 构建日志信息
     log_message = f"[{generator_type}生成器] "
 
-    # 添加参数信息
-    param_str = json.dumps(params, ensure_ascii=False, indent=2)
+    # 添加参数信息（单行紧凑JSON，便于逐行检索）
+    param_str = json.dumps(params, ensure_ascii=False, separators=(',', ':'))
     log_message += f"参数: {param_str}"
 
     logger.info(log_message)
@@ -200,28 +219,65 @@ def get_log_info():
     获取日志文件信息
 
     Returns:
-        日志文件信息列表
+        日志文件信息列表（含 "mtime_ns"、"size"，可直接作为内容缓存的键，无需再次 stat）
     """
-    log_files = []
-
     if not os.path.exists(LOG_DIR):
-        return log_files
-
-    for filename in os.listdir(LOG_DIR):
-        if filename.endswith('.log'):
-            filepath = os.path.join(LOG_DIR, filename)
-            file_size = os.path.getsize(filepath)
-            file_mtime = os.path.getmtime(filepath)
+        return []
 
-            log_files.append({
-                "文件名": filename,
-                "文件路径": filepath,
-                "大小(MB)": round(file_size / (1024 * 1024), 2),
-                "修改时间": datetime.fromtimestamp(file_mtime).strftime('%Y-%m-%d %H:%M:%S')
-            })
+    # scandir 每个条目只需一次 stat
+    entries = []
+    with os.scandir(LOG_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.log'):
+                entries.append((entry, entry.stat()))
 
     # 按修改时间降序排序
-    log_files.sort(key=lambda x: x["修改时间"], reverse=True)
+    entries.sort(key=lambda e: e[1].st_mtime, reverse=True)
+
+    return [
+        {
+            "文件名": entry.name,
+            "文件路径": entry.path,
+            "大小(MB)": round(st.st_size / (1024 * 1024), 2),
+            "修改时间": datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+        }
+        for entry, st in entries
+    ]
+
+
+def read_log_tail(filepath, max_lines=100, block_size=8192):
+    """
+    读取日志文件的最后若干行
+
+    小文件（<64KB）直接整体读取；大文件从末尾按块向前读，
+    凑够行数即停止，不必读入整个文件。
 
-    return log_files
+    Args:
+        filepath: 日志文件路径
+        max_lines: 最多返回的行数
+        block_size: 每次向前读取的字节数
 
+    Returns:
+        tuple: (content, total_lines)
+               - content: str, 最后 max_lines 行的内容
+               - total_lines: int 或 None, 文件总行数（大文件不统计，为None）
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        if size < 64 * 1024:
+            lines = f.read().decode('utf-8').split('\n')
+            return '\n'.join(lines[-max_lines:]), len(lines)
+
+        data = b''
+        pos = size
+        while pos > 0 and data.count(b'\n') < max_lines:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+    # '\n' never occurs inside a multi-byte UTF-8 sequence, so splitting bytes is safe
+    lines = data.split(b'\n')[-max_lines:]
+    return b'\n'.join(lines).decode('utf-8', errors='replace'), None
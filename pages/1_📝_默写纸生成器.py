@@ -4,9 +4,8 @@
 """
 
 import streamlit as st
-import os
-import tempfile
-from generator import make_chongmo_pdf, generate_preview_image
+from io import BytesIO
+from generator import make_chongmo_pdf, pdf_to_preview_image
 from logger_utils import log_dictation_generation
 from access_control import get_client_ip
 st.set_page_config(
@@ -14,6 +13,41 @@ st.set_page_config(
     page_icon="📝",
     layout="wide"
 )
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_pdf_bytes(date_str, scope, items, cols, rows, font_size, padding):
+    """
+    生成默写纸PDF（按参数缓存）
+
+    预览和下载共用同一份PDF；来回调整参数时直接命中缓存。
+
+    Args:
+        items: 项目元组（需可哈希）
+
+    Returns:
+        bytes: PDF文件内容
+    """
+    pdf_buffer = BytesIO()
+    make_chongmo_pdf(
+        date_str, scope, list(items), pdf_buffer,
+        cols=cols, rows=rows, font_size=font_size, padding=padding
+    )
+    return pdf_buffer.getvalue()
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_preview_png(date_str, scope, items, cols, rows, font_size, padding, dpi):
+    """
+    生成PDF第一页的PNG预览图（按参数缓存）
+
+    Returns:
+        bytes: PNG图片内容
+    """
+    pdf_data = build_pdf_bytes(date_str, scope, items, cols, rows, font_size, padding)
+    return pdf_to_preview_image(pdf_data, dpi=dpi)
+
+
 st.title("📝 默写纸生成器")
 st.caption("生成灵活布局的默写PDF - 支持自定义行列数、字号和任意数量内容")
 st.markdown("---")
@@ -98,7 +132,7 @@ with col_left:
         label_visibility="collapsed"
     )
 
-    items = [line.strip() for line in text_input.strip().split('\n') if line.strip()]
+    items = list(filter(None, (line.strip() for line in text_input.splitlines())))
 
 with col_right:
     # 内容预览
@@ -113,10 +147,9 @@ with col_right:
         # 显示PDF预览图
         try:
             with st.spinner("生成预览中..."):
-                preview_image = generate_preview_image(
-                    date_str, scope, items,
-                    cols=col_num, rows=row_num, font_size=font_size,
-                    padding=padding, dpi=120
+                preview_image = build_preview_png(
+                    date_str, scope, tuple(items),
+                    col_num, row_num, font_size, padding, dpi=96
                 )
                 st.image(preview_image, caption="PDF预览（第一页）", width='stretch')
         except Exception as e:
@@ -140,19 +173,8 @@ with col_btn2:
         else:
             with st.spinner("正在生成PDF..."):
                 try:
-                    # 创建临时文件
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-                        output_path = tmp_pdf.name
-
-                    # 生成PDF with custom parameters
-                    make_chongmo_pdf(
-                        date_str, scope, items, output_path,
-                        cols=col_num, rows=row_num, font_size=font_size, padding=padding
-                    )
-
-                    # 读取PDF
-                    with open(output_path, "rb") as pdf_file:
-                        pdf_data = pdf_file.read()
+                    # 与预览共用同一份PDF（参数未变时不会重新生成）
+                    pdf_data = build_pdf_bytes(date_str, scope, tuple(items), col_num, row_num, font_size, padding)
 
                     # 记录日志
                     log_dictation_generation(
@@ -179,10 +201,6 @@ with col_btn2:
                         width='stretch',
                     )
 
-                    # 清理临时文件
-                    if os.path.exists(output_path):
-                        os.unlink(output_path)
-
                 except Exception as e:
                     st.error(f"生成PDF时出错: {str(e)}")
                     import traceback
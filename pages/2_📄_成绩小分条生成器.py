@@ -5,11 +5,17 @@ Streamlit GUI for Student Grades Generator
 """
 
 import streamlit as st
-import pandas as pd
+import pyarrow as pa
 import os
+import atexit
+import hashlib
+import shutil
 import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from io import BytesIO
-from student_grades_generator import generate_pdf
+from student_grades_generator import detect_key_columns, generate_pdf, read_excel
 from reportlab.lib.pagesizes import A4, landscape, portrait
 from logger_utils import log_grades_generation
 from access_control import get_client_ip
@@ -20,6 +26,13 @@ st.set_page_config(
     layout="wide"
 )
 
+# 页面尺寸（点）
+A4_PORTRAIT = portrait(A4)
+A4_LANDSCAPE = landscape(A4)
+
+# 最多同时保留的上传字体文件数（超出后删除最久未使用的）
+MAX_UPLOADED_FONTS = 8
+
 
 def validate_filename(filename):
     """
@@ -81,6 +94,222 @@ def validate_filename(filename):
     return True, None, final_filename
 
 
+def _digest(data):
+    """
+    计算上传内容的摘要，作为缓存键
+
+    每次重跑只对上传文件计算一次摘要；缓存函数以摘要为键，
+    原始字节通过下划线参数传入（Streamlit 不对其做哈希）。
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_excel(name, digest, _data):
+    """
+    读取上传的Excel文件（按文件名和内容缓存）
+
+    Streamlit 每次控件变化都会重跑整个脚本，缓存后只有上传新文件时才重新解析。
+    只保留最近几个文件，避免多人上传大表时内存持续增长。
+
+    Args:
+        name: 上传文件名（用于判断扩展名）
+        digest: 文件内容摘要（缓存键）
+        _data: 文件内容字节
+
+    Returns:
+        pd.DataFrame: 读取到的数据
+    """
+    file_ext = os.path.splitext(name)[1].lower()
+    return read_excel(BytesIO(_data), file_ext)
+
+
+@st.cache_resource(show_spinner=False)
+def _template_bytes(path):
+    """
+    读取Excel模板内容（每个进程只读一次）
+
+    Args:
+        path: 模板文件路径
+
+    Returns:
+        bytes 或 None: 文件不存在时返回None
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as template:
+        return template.read()
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _preview_table(name, digest, _data):
+    """
+    数据预览用的前10行（转换为 Arrow 表后缓存，重跑时无需再次转换）
+
+    Args:
+        name: 上传文件名
+        digest: 文件内容摘要（缓存键）
+        _data: 文件内容字节
+
+    Returns:
+        pa.Table 或 pd.DataFrame: 混合类型列无法转换时返回原始的前10行
+    """
+    head = _load_excel(name, digest, _data).head(10)
+    try:
+        return pa.Table.from_pandas(head)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Let st.dataframe apply its own sanitizing
+        return head
+
+
+@st.cache_resource(show_spinner=False)
+def _font_store():
+    """
+    上传字体的存放位置（每个进程一份）
+
+    Returns:
+        tuple: (目录, OrderedDict[(digest, suffix) -> 路径], 锁)
+               目录为本进程创建的临时目录，进程退出时整体删除
+    """
+    font_dir = tempfile.mkdtemp(prefix="grades_fonts_")
+    atexit.register(shutil.rmtree, font_dir, True)
+    return font_dir, OrderedDict(), threading.Lock()
+
+
+def _prepared_font_path(digest, suffix, font_bytes):
+    """
+    将上传的字体写入本进程的临时目录（按内容哈希命名，同一字体只写一次）
+
+    最多保留 MAX_UPLOADED_FONTS 个文件，超出时删除最久未使用的；
+    generate_pdf 按路径注册字体，同一路径不会重复解析。
+
+    Args:
+        digest: 字体内容摘要（也用作文件名）
+        suffix: 文件扩展名（.ttf / .ttc）
+        font_bytes: 字体文件内容
+
+    Returns:
+        str: 字体文件路径
+    """
+    font_dir, fonts, lock = _font_store()
+    key = (digest, suffix)
+    with lock:
+        font_path = fonts.get(key)
+        if font_path is not None and os.path.isfile(font_path):
+            fonts.move_to_end(key)
+            return font_path
+        font_path = os.path.join(font_dir, f"{digest}{suffix}")
+        # Write under a temporary name first so readers never see a partial file
+        with tempfile.NamedTemporaryFile(dir=font_dir, delete=False, suffix=suffix) as tmp_font:
+            tmp_font.write(font_bytes)
+        os.replace(tmp_font.name, font_path)
+        fonts[key] = font_path
+        while len(fonts) > MAX_UPLOADED_FONTS:
+            _, evicted = fonts.popitem(last=False)
+            try:
+                os.remove(evicted)
+            except OSError:
+                pass
+    return font_path
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _render_preview_png(excel_name, excel_digest, _excel_bytes, font_path, detail_cols, cards_per_page,
+                        **layout):
+    """
+    生成预览PDF并渲染第一页为PNG（按全部参数缓存）
+
+    参数没变时（例如重新上传同一字体）直接返回缓存的图片，
+    既不重新生成PDF，也不重新光栅化。
+
+    Args:
+        excel_name: 上传文件名
+        excel_digest: 文件内容摘要（缓存键）
+        _excel_bytes: 文件内容字节
+        font_path: 字体文件路径
+        detail_cols: 选择的列（元组）
+        cards_per_page: 每页卡片数
+        **layout: 传给 generate_pdf 的版面参数
+
+    Returns:
+        bytes: PNG图片内容
+
+    Raises:
+        ImportError: 未安装 PyMuPDF
+    """
+    import fitz  # PyMuPDF
+
+    # Only the first page is drawn, so hand over just those rows
+    df = _load_excel(excel_name, excel_digest, _excel_bytes)
+    key_cols = detect_columns(tuple(df.columns))["key_cols"]
+    if key_cols is None:
+        # generate_pdf falls back to positional columns; keep them in place
+        df = df.head(cards_per_page)
+    else:
+        df = df.head(cards_per_page)[list(dict.fromkeys([*key_cols, *detail_cols]))]
+
+    # Build the preview PDF in memory
+    pdf_buffer = BytesIO()
+    generate_pdf(
+        df=df,
+        output_path=pdf_buffer,
+        font_path=font_path,
+        detail_cols=list(detail_cols),
+        key_cols=key_cols,
+        preview_only=True,
+        max_preview_cards=cards_per_page,
+        **layout
+    )
+
+    # Render page to image (1.25 = 90 DPI; st.image scales it to the column)
+    pdf_doc = fitz.open(stream=pdf_buffer.getvalue(), filetype="pdf")
+    pix = pdf_doc[0].get_pixmap(matrix=fitz.Matrix(1.25, 1.25))
+    png_bytes = pix.tobytes("png")
+    pdf_doc.close()
+
+    return png_bytes
+
+
+@lru_cache(maxsize=256)
+def card_layout(portrait_mode, cols, rows, card_h, margin, gutter):
+    """
+    计算卡片宽度和每页实际可放下的行数、卡片数（与 generate_pdf 一致）
+
+    Returns:
+        tuple: (card_w, actual_rows, cards_per_page)
+    """
+    page_w, page_h = A4_PORTRAIT if portrait_mode else A4_LANDSCAPE
+    usable_w = page_w - 2 * margin
+    usable_h = page_h - 2 * margin
+    card_w = (usable_w - (cols - 1) * gutter) / cols
+    max_rows_fit = max(1, int((usable_h + gutter) // (card_h + gutter)))
+    actual_rows = min(rows, max_rows_fit)
+    return card_w, actual_rows, cols * actual_rows
+
+
+@st.cache_data(show_spinner=False)
+def detect_columns(columns):
+    """
+    识别学号、姓名、班级列以及其余成绩列（按表头元组缓存）
+    表头规则与 generate_pdf 相同（detect_key_columns）；未识别到的列不按位置回退，
+    以免把成绩列当成班级列而不出现在可选项中
+
+    Args:
+        columns: 表头元组
+
+    Returns:
+        dict: {"key_cols": 三列都识别到时为 (学号列, 姓名列, 班级列)，否则为None
+               （交给 generate_pdf 在完整表头上按位置回退）,
+               "details": 其余列列表}
+    """
+    found = detect_key_columns(columns, positional_fallback=False)
+    special = {c for c in found if c is not None}
+    return {
+        "key_cols": None if None in found else found,
+        "details": [c for c in columns if c not in special],
+    }
+
+
 st.title("📄 学生成绩小分条生成器")
 st.markdown("---")
 
@@ -89,11 +318,8 @@ with st.sidebar:
     st.header("📥 下载模板")
 
     # Template download
-    template_file = "template.xlsx"
-    if os.path.exists(template_file):
-        with open(template_file, "rb") as template:
-            template_data = template.read()
-
+    template_data = _template_bytes("template.xlsx")
+    if template_data is not None:
         st.download_button(
             label="⬇️ 下载Excel模板",
             data=template_data,
@@ -152,17 +378,13 @@ if uploaded_excel is None:
 # Preview Excel data
 st.header("📊 数据预览")
 try:
-    # Detect file extension and use appropriate engine
+    # Cached by file name + content, so widget changes don't re-parse the workbook
     file_ext = os.path.splitext(uploaded_excel.name)[1].lower()
-    if file_ext == '.xls':
-        df = pd.read_excel(uploaded_excel, engine="xlrd")
-    elif file_ext == '.xlsx':
-        df = pd.read_excel(uploaded_excel, engine="openpyxl")
-    else:
-        # Try openpyxl as default
-        df = pd.read_excel(uploaded_excel, engine="openpyxl")
+    excel_bytes = uploaded_excel.getvalue()
+    excel_digest = _digest(excel_bytes)
+    df = _load_excel(uploaded_excel.name, excel_digest, excel_bytes)
 
-    st.dataframe(df.head(10), width='stretch')
+    st.dataframe(_preview_table(uploaded_excel.name, excel_digest, excel_bytes), width='stretch')
     st.caption(f"共 {len(df)} 条记录，文件格式: {file_ext}")
 except Exception as e:
     st.error(f"读取Excel文件失败: {str(e)}")
@@ -174,18 +396,10 @@ st.markdown("---")
 st.header("📝 选择要显示的列")
 st.caption("勾选需要在PDF中显示的成绩项目（姓名、学号会自动显示）")
 
-# Find name, code, and class columns
-code_col_candidates = [c for c in df.columns if str(c).strip() in ("学号", "学号/Code", "code", "Code")]
-code_col = code_col_candidates[0] if code_col_candidates else None
-
-name_col_candidates = [c for c in df.columns if str(c).strip() in ("姓名", "姓名/Name", "name", "Name")]
-name_col = name_col_candidates[0] if name_col_candidates else None
-
-class_col_candidates = [c for c in df.columns if str(c).strip() in ("班级", "班级/Class", "class", "Class")]
-class_col = class_col_candidates[0] if class_col_candidates else None
-
-# Get all columns except name, code, and class
-detail_cols_all = [cn for cn in df.columns if (not isinstance(cn, str)) or (((name_col is None) or cn != name_col) and (code_col is None or cn != code_col) and (class_col is None or cn != class_col))]
+# Find name, code, and class columns; everything else is a detail column
+detected = detect_columns(tuple(df.columns))
+key_cols = detected["key_cols"]
+detail_cols_all = detected["details"]
 
 # Create checkboxes for each column
 if detail_cols_all:
@@ -216,6 +430,12 @@ else:
 
 st.markdown("---")
 
+# Prepare font path (hashed once per rerun, shared by preview and generation)
+font_path = "./simsun.ttc"
+if uploaded_font is not None:
+    font_bytes = uploaded_font.getvalue()
+    font_path = _prepared_font_path(_digest(font_bytes), os.path.splitext(uploaded_font.name)[1], font_bytes)
+
 # Configuration columns
 col1, col2 = st.columns([1, 1])
 
@@ -324,95 +544,56 @@ with col2:
     st.caption("参数变化时自动更新预览")
 
     # Generate preview automatically using generate_pdf function
-    with st.spinner("正在生成预览..."):
-        try:
-            # Prepare font path
-            font_path = ""
-            if uploaded_font is not None:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_font.name)[1]) as tmp_font:
-                    tmp_font.write(uploaded_font.getvalue())
-                    font_path = tmp_font.name
-            if font_path == "":
-                font_path = "./simsun.ttc"
-
-            # Create temporary PDF for preview
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-                tmp_pdf_path = tmp_pdf.name
-
-            # Calculate cards per page for display
-            page_w, page_h = A4
-            if orientation == "纵向":
-                page_w, page_h = portrait(A4)
-            else:
-                page_w, page_h = landscape(A4)
-            usable_w = page_w - 2 * margin
-            usable_h = page_h - 2 * margin
-            card_w = (usable_w - (cols - 1) * gutter) / cols
-            max_rows_fit = max(1, int((usable_h + gutter) // (card_h + gutter)))
-            actual_rows = min(rows, max_rows_fit)
-            cards_per_page = cols * actual_rows
-
-            # Use generate_pdf function for preview
-            generate_pdf(
-                df=df,
-                output_path=tmp_pdf_path,
-                font_path=font_path,
-                title=title,
-                card_title=card_title,
-                cols=cols,
-                rows=rows,
-                portrait_mode=(orientation == "纵向"),
-                card_h=card_h,
-                margin=margin,
-                gutter=gutter,
-                title_font_size=title_font_size,
-                card_title_font_size=card_title_font_size,
-                body_font_size=body_font_size,
-                detail_cols=detail_cols,
-                preview_only=True,
-                max_preview_cards=cards_per_page
-            )
-
-            # Convert PDF to image using PyMuPDF (fitz)
-            try:
-                import fitz  # PyMuPDF
-                from PIL import Image
-
-                # Open PDF with PyMuPDF
-                pdf_doc = fitz.open(tmp_pdf_path)
-                page = pdf_doc[0]  # Get first page
-
-                # Render page to image (2.0 = 144 DPI)
-                mat = fitz.Matrix(2.0, 2.0)
-                pix = page.get_pixmap(matrix=mat)
-
-                # Convert to PIL Image
-                img_data = pix.tobytes("png")
-                img = Image.open(BytesIO(img_data))
-
-                # Display the preview image
-                st.image(img, caption=f"预览：{cols}列 × {actual_rows}行布局", width='stretch')
-                st.caption(f"💡 实际生成时将包含 {len(df)} 条记录")
-
-                # Close PDF
-                pdf_doc.close()
-
-            except ImportError:
-                st.warning("⚠️ 预览功能需要安装 PyMuPDF 库  \n运行: `pip install PyMuPDF`")
-                st.info(f"📊 布局信息：  \n- 页面方向：{orientation}  \n- 每页卡片：{cols}列 × {actual_rows}行 = {cards_per_page}张  \n- 卡片尺寸：{card_w:.1f} × {card_h:.1f} 点")
-            except Exception as preview_error:
-                st.error(f"预览转换失败: {str(preview_error)}")
-                st.info(f"📊 布局信息：  \n- 页面方向：{orientation}  \n- 每页卡片：{cols}列 × {actual_rows}行 = {cards_per_page}张  \n- 卡片尺寸：{card_w:.1f} × {card_h:.1f} 点")
+    try:
+        # Calculate cards per page for display
+        card_w, actual_rows, cards_per_page = card_layout(
+            orientation == "纵向", cols, rows, card_h, margin, gutter
+        )
 
-            # Cleanup
-            if os.path.exists(tmp_pdf_path):
-                os.unlink(tmp_pdf_path)
-            if uploaded_font is not None and font_path and os.path.exists(font_path):
-                os.unlink(font_path)
+        layout = dict(
+            title=title,
+            card_title=card_title,
+            cols=cols,
+            rows=rows,
+            portrait_mode=(orientation == "纵向"),
+            card_h=card_h,
+            margin=margin,
+            gutter=gutter,
+            title_font_size=title_font_size,
+            card_title_font_size=card_title_font_size,
+            body_font_size=body_font_size
+        )
 
-        except Exception as e:
-            st.error(f"生成预览失败: {str(e)}")
-            st.info(f"📊 布局信息：\n- 页面方向：{orientation}\n- 布局：{cols}列 × {rows}行\n- 卡片高度：{card_h}点")
+        try:
+            # Same inputs as the last run of this session: reuse the image as is
+            preview_fp = (excel_digest, font_path, tuple(detail_cols), cards_per_page,
+                          tuple(sorted(layout.items())))
+            if st.session_state.get("_preview_fp") != preview_fp:
+                with st.spinner("正在生成预览..."):
+                    # Cached on every input, so unrelated reruns reuse the image
+                    st.session_state["_preview_png"] = _render_preview_png(
+                        uploaded_excel.name,
+                        excel_digest,
+                        excel_bytes,
+                        font_path,
+                        tuple(detail_cols),
+                        cards_per_page,
+                        **layout
+                    )
+                st.session_state["_preview_fp"] = preview_fp
+            preview_png = st.session_state["_preview_png"]
+
+            # Display the preview image
+            st.image(preview_png, caption=f"预览：{cols}列 × {actual_rows}行布局", width='stretch')
+            st.caption(f"💡 实际生成时将包含 {len(df)} 条记录")
+
+        except ImportError:
+            st.warning("⚠️ 预览功能需要安装 PyMuPDF 库  \n运行: `pip install PyMuPDF`")
+            st.info(f"📊 布局信息：  \n- 页面方向：{orientation}  \n- 每页卡片：{cols}列 × {actual_rows}行 = {cards_per_page}张  \n- 卡片尺寸：{card_w:.1f} × {card_h:.1f} 点")
+
+    except Exception as e:
+        st.error(f"生成预览失败: {str(e)}")
+        st.info(f"📊 布局信息：\n- 页面方向：{orientation}\n- 布局：{cols}列 × {rows}行\n- 卡片高度：{card_h}点")
 
 st.markdown("---")
 
@@ -432,23 +613,13 @@ if st.button("🎨 生成PDF", type="primary", width='stretch'):
                 st.error("❌ 请至少选择一个项目")
                 st.stop()
 
-            # Prepare font path
-            font_path = ""
-            if uploaded_font is not None:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_font.name)[1]) as tmp_font:
-                    tmp_font.write(uploaded_font.getvalue())
-                    font_path = tmp_font.name
-            if font_path == "":
-                font_path = "./simsun.ttc"
-
-            # Create output PDF in temp file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-                output_pdf = tmp_pdf.name
+            # Render straight into memory
+            pdf_buffer = BytesIO()
 
             # Use generate_pdf function
             generate_pdf(
                 df=df,
-                output_path=output_pdf,
+                output_path=pdf_buffer,
                 font_path=font_path,
                 title=title,
                 card_title=card_title,
@@ -462,13 +633,12 @@ if st.button("🎨 生成PDF", type="primary", width='stretch'):
                 card_title_font_size=card_title_font_size,
                 body_font_size=body_font_size,
                 detail_cols=detail_cols,
+                key_cols=key_cols,
                 preview_only=False,
                 max_preview_cards=None
             )
 
-            # Read PDF and offer download
-            with open(output_pdf, "rb") as pdf_file:
-                pdf_data = pdf_file.read()
+            pdf_data = pdf_buffer.getvalue()
 
             # 记录日志
             log_grades_generation(
@@ -500,12 +670,6 @@ if st.button("🎨 生成PDF", type="primary", width='stretch'):
                 width='stretch',
             )
 
-            # Cleanup temp files
-            if uploaded_font is not None and font_path and os.path.exists(font_path):
-                os.unlink(font_path)
-            if os.path.exists(output_pdf):
-                os.unlink(output_pdf)
-
         except Exception as e:
             st.error(f"生成PDF时出错: {str(e)}")
             import traceback
@@ -7,11 +7,17 @@
 import streamlit as st
 import pandas as pd
 import os
+import sqlite3
+from contextlib import closing
 from datetime import datetime
 from access_control import is_local_access, get_client_ip
 
-# 问题报告CSV文件路径
-ISSUES_FILE = "issues_report.csv"
+# 问题报告数据库路径（SQLite）
+ISSUES_DB = "issues_report.db"
+# 旧版存储文件（CSV），首次创建数据库时自动迁移
+LEGACY_CSV_FILE = "issues_report.csv"
+# 问题列表每页显示的数量
+ISSUES_PER_PAGE = 20
 
 st.set_page_config(
     page_title="问题报告",
@@ -24,98 +30,153 @@ st.caption("反馈使用中遇到的问题")
 st.markdown("---")
 
 
-def load_issues():
-    """加载问题报告数据"""
-    if os.path.exists(ISSUES_FILE):
-        try:
-            df = pd.read_csv(ISSUES_FILE, encoding='utf-8', dtype={
-                'id': 'int64',
-                'ip': 'str',
-                'timestamp': 'str',
-                'content': 'str',
-                'replies': 'str',
-                'reply_timestamps': 'str'
-            })
-            # 确保必要的列存在
-            required_columns = ['id', 'ip', 'timestamp', 'content', 'replies', 'reply_timestamps']
-            for col in required_columns:
-                if col not in df.columns:
-                    df[col] = ''
-            return df
-        except Exception as e:
-            st.error(f"加载问题报告失败：{e}")
-            return pd.DataFrame(columns=['id', 'ip', 'timestamp', 'content', 'replies', 'reply_timestamps'])
-    else:
-        return pd.DataFrame(columns=['id', 'ip', 'timestamp', 'content', 'replies', 'reply_timestamps'])
+# 问题报告的列
+ISSUE_COLUMNS = ['id', 'ip', 'timestamp', 'content', 'replies', 'reply_timestamps']
+
+
+def _connect():
+    """打开数据库连接（每次操作单独连接，多个会话并发时互不影响）"""
+    conn = sqlite3.connect(ISSUES_DB, timeout=10)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _legacy_records():
+    """
+    读取旧版 CSV 问题报告
+
+    Returns:
+        tuple: (issues, replies)
+               - issues: [(id, ip, timestamp, content), ...]
+               - replies: [(issue_id, timestamp, content), ...]
+    """
+    issues, replies = [], []
+    if os.path.exists(LEGACY_CSV_FILE):
+        df = pd.read_csv(LEGACY_CSV_FILE, encoding='utf-8', dtype={
+            'id': 'int64',
+            'ip': 'str',
+            'timestamp': 'str',
+            'content': 'str',
+            'replies': 'str',
+            'reply_timestamps': 'str'
+        })
+        # 确保必要的列存在，空单元格记为空字符串
+        for col in ISSUE_COLUMNS:
+            if col not in df.columns:
+                df[col] = ''
+        df[ISSUE_COLUMNS[1:]] = df[ISSUE_COLUMNS[1:]].fillna('')
+        for row in df.itertuples(index=False):
+            issues.append((int(row.id), row.ip, row.timestamp, row.content))
+            if row.replies:
+                for reply, reply_time in zip(row.replies.split('||'), row.reply_timestamps.split('||')):
+                    replies.append((int(row.id), reply_time, reply))
+
+    return issues, replies
+
+
+@st.cache_resource(show_spinner=False)
+def _init_db():
+    """建表；数据库首次创建时迁移旧版数据（每个进程只执行一次）"""
+    is_new = not os.path.exists(ISSUES_DB)
+    with closing(_connect()) as conn, conn:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS issues (
+                id INTEGER PRIMARY KEY,
+                ip TEXT,
+                timestamp TEXT,
+                content TEXT
+            );
+            CREATE TABLE IF NOT EXISTS replies (
+                issue_id INTEGER NOT NULL REFERENCES issues(id) ON DELETE CASCADE,
+                timestamp TEXT,
+                content TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_replies_issue_id ON replies(issue_id);
+        """)
+        if is_new:
+            issues, replies = _legacy_records()
+            conn.executemany("INSERT OR REPLACE INTO issues (id, ip, timestamp, content) VALUES (?, ?, ?, ?)", issues)
+            conn.executemany("INSERT INTO replies (issue_id, timestamp, content) VALUES (?, ?, ?)", replies)
+
+
+def count_issues():
+    """问题总数"""
+    try:
+        with closing(_connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0]
+    except sqlite3.Error as e:
+        st.error(f"加载问题报告失败：{e}")
+        return 0
+
 
+def load_issues_page(offset, limit):
+    """
+    按ID降序读取一页问题及其回复
 
-def save_issues(df):
-    """保存问题报告数据"""
+    Returns:
+        pd.DataFrame: ISSUE_COLUMNS 各列，replies / reply_timestamps 为列表
+    """
+    try:
+        with closing(_connect()) as conn:
+            df = pd.read_sql_query(
+                "SELECT id, ip, timestamp, content FROM issues ORDER BY id DESC LIMIT ? OFFSET ?",
+                conn, params=(limit, offset)
+            )
+            replies = {int(issue_id): ([], []) for issue_id in df['id']}
+            if replies:
+                placeholders = ','.join('?' * len(replies))
+                rows = conn.execute(
+                    f"SELECT issue_id, timestamp, content FROM replies "
+                    f"WHERE issue_id IN ({placeholders}) ORDER BY rowid",
+                    list(replies)
+                )
+                for issue_id, reply_time, reply in rows:
+                    replies[issue_id][0].append(reply)
+                    replies[issue_id][1].append(reply_time)
+    except sqlite3.Error as e:
+        st.error(f"加载问题报告失败：{e}")
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+
+    df['replies'] = [replies[int(issue_id)][0] for issue_id in df['id']]
+    df['reply_timestamps'] = [replies[int(issue_id)][1] for issue_id in df['id']]
+    return df
+
+
+def _execute(sql, params):
+    """执行一条写入语句，返回受影响的行数；失败时返回None"""
     try:
-        df.to_csv(ISSUES_FILE, index=False, encoding='utf-8')
-        return True
-    except Exception as e:
+        with closing(_connect()) as conn, conn:
+            return conn.execute(sql, params).rowcount
+    except sqlite3.Error as e:
         st.error(f"保存问题报告失败：{e}")
-        return False
+        return None
 
 
 def add_issue(content, ip):
     """添加新问题"""
-    df = load_issues()
-
-    # 生成新ID
-    if len(df) == 0:
-        new_id = 1
-    else:
-        new_id = df['id'].max() + 1
-
-    # 创建新记录
-    new_issue = pd.DataFrame([{
-        'id': new_id,
-        'ip': ip,
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'content': content,
-        'replies': '',
-        'reply_timestamps': ''
-    }])
-
-    df = pd.concat([df, new_issue], ignore_index=True)
-    return save_issues(df)
+    # INTEGER PRIMARY KEY: 新ID为当前最大ID + 1
+    return _execute(
+        "INSERT INTO issues (ip, timestamp, content) VALUES (?, ?, ?)",
+        (ip, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), content)
+    ) is not None
 
 
 def add_reply(issue_id, reply_content):
     """添加回复（仅限管理员）"""
-    df = load_issues()
-    idx = df[df['id'] == issue_id].index
-
-    if len(idx) == 0:
-        return False
-
-    idx = idx[0]
-    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-    # 获取现有回复
-    existing_replies = df.at[idx, 'replies']
-    existing_timestamps = df.at[idx, 'reply_timestamps']
-
-    # 添加新回复
-    if pd.isna(existing_replies) or existing_replies == '':
-        df.at[idx, 'replies'] = reply_content
-        df.at[idx, 'reply_timestamps'] = current_time
-    else:
-        df.at[idx, 'replies'] = existing_replies + '||' + reply_content
-        df.at[idx, 'reply_timestamps'] = existing_timestamps + '||' + current_time
-
-    return save_issues(df)
+    return bool(_execute(
+        "INSERT INTO replies (issue_id, timestamp, content) "
+        "SELECT id, ?, ? FROM issues WHERE id = ?",
+        (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), reply_content, int(issue_id))
+    ))
 
 
 def delete_issue(issue_id):
-    """删除问题（仅限管理员）"""
-    df = load_issues()
-    df = df[df['id'] != issue_id]
-    return save_issues(df)
+    """删除问题及其回复（仅限管理员）"""
+    return _execute("DELETE FROM issues WHERE id = ?", (int(issue_id),)) is not None
 
 
+_init_db()
+
 # 检查访问权限
 is_admin = is_local_access()
 client_ip = get_client_ip()
@@ -155,32 +216,39 @@ st.markdown("---")
 # 显示所有问题
 st.subheader("📋 问题列表")
 
-issues_df = load_issues()
+total_issues = count_issues()
 
-if len(issues_df) == 0:
+if total_issues == 0:
     st.info("📭 暂无问题报告")
 else:
-    # 按ID降序排列（最新的在前）
-    issues_df = issues_df.sort_values('id', ascending=False)
-
-    st.caption(f"共 {len(issues_df)} 个问题报告")
-    display_id = len(issues_df)
-
-    for idx, row in issues_df.iterrows():
-        issue_id = display_id
-        display_id -= 1
-        issue_ip = row['ip']
-        issue_time = row['timestamp']
-        issue_content = row['content']
-        replies = row['replies'] if pd.notna(row['replies']) and row['replies'] else ''
-        reply_times = row['reply_timestamps'] if pd.notna(row['reply_timestamps']) and row['reply_timestamps'] else ''
+    # 分页显示（最新的在前），每页只读取和创建 ISSUES_PER_PAGE 个问题
+    page_count = (total_issues + ISSUES_PER_PAGE - 1) // ISSUES_PER_PAGE
+    if page_count > 1:
+        page = st.number_input("页码", min_value=1, max_value=page_count, value=1, step=1)
+        st.caption(f"共 {total_issues} 个问题报告，第 {page}/{page_count} 页")
+    else:
+        page = 1
+        st.caption(f"共 {total_issues} 个问题报告")
+    start = (page - 1) * ISSUES_PER_PAGE
+
+    issues_df = load_issues_page(start, ISSUES_PER_PAGE)
+    # 显示编号：最新的问题编号最大，与数据库ID无关（删除后ID会有空缺）
+    issues_df['display_id'] = total_issues - start - issues_df.index
+
+    for row in issues_df.itertuples(index=False):
+        issue_id = int(row.id)
+        issue_ip = row.ip
+        issue_time = row.timestamp
+        issue_content = row.content
+        replies = row.replies
+        reply_times = row.reply_timestamps
 
         with st.container():
             # 问题头部
             col1, col2 = st.columns([5, 1])
 
             with col1:
-                st.markdown(f"### 🆔 问题 #{issue_id}")
+                st.markdown(f"### 🆔 问题 #{row.display_id}")
                 st.caption(f"📍 IP: `{issue_ip}` | ⏰ 时间: {issue_time}")
 
             with col2:
@@ -198,11 +266,8 @@ else:
 
             # 显示回复
             if replies:
-                reply_list = replies.split('||')
-                reply_time_list = reply_times.split('||')
-
                 st.markdown("**💬 管理员回复：**")
-                for i, (reply, reply_time) in enumerate(zip(reply_list, reply_time_list)):
+                for reply, reply_time in zip(replies, reply_times):
                     st.success(f"🔹 {reply}\n\n*回复时间: {reply_time}*")
 
             # 管理员回复表单
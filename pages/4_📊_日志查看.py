@@ -5,8 +5,7 @@
 """
 
 import streamlit as st
-import os
-from logger_utils import get_log_info, LOG_DIR
+from logger_utils import get_log_info, read_log_tail, LOG_DIR
 from access_control import check_admin_access
 
 st.set_page_config(
@@ -15,6 +14,13 @@ st.set_page_config(
     layout="wide"
 )
 
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _log_tail(path, mtime_ns, size):
+    """日志末尾100行（按文件路径、修改时间和大小缓存，文件未变化时不再读取）"""
+    return read_log_tail(path, max_lines=100)
+
+
 st.title("📊 日志查看")
 st.caption("🔒 管理员功能 - 仅限本地访问")
 st.markdown("---")
@@ -34,22 +40,19 @@ else:
     st.subheader("📋 日志文件列表")
 
     for log_file in log_files:
+        file_key = (log_file['文件路径'], log_file['mtime_ns'], log_file['size'])
         with st.expander(f"📄 {log_file['文件名']} - {log_file['大小(MB)']} MB - {log_file['修改时间']}"):
             col1, col2 = st.columns([3, 1])
 
             with col1:
                 # 读取并显示日志内容
                 try:
-                    with open(log_file['文件路径'], 'r', encoding='utf-8') as f:
-                        log_content = f.read()
-
-                    # 显示最后100行
-                    lines = log_content.split('\n')
-                    if len(lines) > 100:
-                        st.caption(f"显示最后100行（共{len(lines)}行）")
-                        display_content = '\n'.join(lines[-100:])
-                    else:
-                        display_content = log_content
+                    # 显示最后100行（大文件只读取末尾部分）
+                    display_content, total_lines = _log_tail(*file_key)
+                    if total_lines is None:
+                        st.caption("显示最后100行")
+                    elif total_lines > 100:
+                        st.caption(f"显示最后100行（共{total_lines}行）")
 
                     st.text_area(
                         "日志内容",
@@ -65,21 +68,21 @@ else:
                 st.metric("文件大小", f"{log_file['大小(MB)']} MB")
                 st.metric("修改时间", log_file['修改时间'])
 
-                # 下载按钮
-                try:
-                    with open(log_file['文件路径'], 'rb') as f:
-                        log_data = f.read()
-
-                    st.download_button(
-                        label="⬇️ 下载日志",
-                        data=log_data,
-                        file_name=log_file['文件名'],
-                        mime="text/plain",
-                        width='stretch',
-                        key=f"download_{log_file['文件名']}"
-                    )
-                except Exception as e:
-                    st.error(f"下载失败: {str(e)}")
+                # 下载按钮：点击"准备下载"后才读取整个文件，平时重跑页面不读取
+                if st.button("📥 准备下载", width='stretch', key=f"prepare_{log_file['文件名']}"):
+                    try:
+                        with open(log_file['文件路径'], 'rb') as f:
+                            log_bytes = f.read()
+                        st.download_button(
+                            label="⬇️ 下载日志",
+                            data=log_bytes,
+                            file_name=log_file['文件名'],
+                            mime="text/plain",
+                            width='stretch',
+                            key=f"download_{log_file['文件名']}"
+                        )
+                    except Exception as e:
+                        st.error(f"下载失败: {str(e)}")
 
 st.markdown("---")
 
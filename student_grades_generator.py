@@ -7,37 +7,133 @@ Make student header strips (cards) PDF from an Excel sheet.
 
 Dependencies:
     pip install pandas reportlab openpyxl
+    pip install python-calamine   # optional, by far the biggest speed-up for large gradebooks
 
 Example:
     python make_strips.py --excel input.xlsx --pdf output.pdf --font /path/to/SimHei.ttf --cols 2 --rows 4
 """
 
 import argparse
+import importlib.util
 import os
-from typing import List, Tuple
+from typing import BinaryIO, Iterable, List, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from reportlab.lib.pagesizes import A4, landscape, portrait
-from reportlab.pdfgen import canvas
+from reportlab.pdfgen import canvas, textobject
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+# openpyxl streaming (read-only) mode for the fallback reader. engine_kwargs
+# only exists on pandas >= 2.1; older versions already use these defaults.
+_PANDAS_VERSION = tuple(int(p) for p in pd.__version__.split(".")[:2])
+_OPENPYXL_KWARGS = (
+    {"engine_kwargs": {"read_only": True, "data_only": True, "keep_links": False}}
+    if _PANDAS_VERSION >= (2, 1) else {}
+)
+
+# calamine (python-calamine, Rust-based) reads .xlsx and .xls several times
+# faster than openpyxl/xlrd; pandas supports it from 2.2. Decided once here
+# rather than probed with a failing read_excel call per file.
+_HAS_CALAMINE = _PANDAS_VERSION >= (2, 2) and importlib.util.find_spec("python_calamine") is not None
+
+
+# font_name -> font_path currently registered under that name (process-wide,
+# so repeated generations don't re-parse large TTC files)
+_registered_fonts = {}
+# font paths that failed to load, so repeated previews don't re-parse them
+_unusable_fonts = set()
+
 
 def try_register_font(font_path: str, font_name: str = "CNFont") -> str:
     """
     Try to register a TrueType font for Chinese text.
     If the file is missing or invalid, fall back to Helvetica (ASCII only).
+    Re-registering the same file under the same name is a no-op, and a file
+    that failed to load is not retried.
     """
-    if font_path and os.path.isfile(font_path):
+    if font_path and _registered_fonts.get(font_name) == font_path:
+        return font_name
+    if font_path and font_path not in _unusable_fonts and os.path.isfile(font_path):
         try:
             pdfmetrics.registerFont(TTFont(font_name, font_path))
+            _registered_fonts[font_name] = font_path
             return font_name
         except Exception as e:
+            _unusable_fonts.add(font_path)
             print(f"[Warn] Failed to register font '{font_path}': {e}")
     print("[Info] Using fallback 'Helvetica' (may not render Chinese).")
     return "Helvetica"
 
 
+def read_excel(source, file_ext: str, **kwargs) -> pd.DataFrame:
+    """
+    Read the first sheet of an Excel file with the fastest available engine.
+    Extra keyword arguments (e.g. usecols, nrows) go to pd.read_excel.
+
+    - calamine (python-calamine) when installed, for both .xlsx and .xls
+    - otherwise .xls -> xlrd, other -> openpyxl in read-only mode
+    """
+    if _HAS_CALAMINE:
+        return pd.read_excel(source, engine="calamine", **kwargs)
+    if file_ext == ".xls":
+        return pd.read_excel(source, engine="xlrd", **kwargs)
+    return pd.read_excel(source, engine="openpyxl", **_OPENPYXL_KWARGS, **kwargs)
+
+
+# Header texts recognised for the key columns (compared after strip())
+CODE_HEADERS = frozenset(("学号", "学号/Code", "code", "Code"))
+NAME_HEADERS = frozenset(("姓名", "姓名/Name", "name", "Name"))
+CLASS_HEADERS = frozenset(("班级", "班级/Class", "class", "Class"))
+
+
+def detect_key_columns(columns, positional_fallback: bool = True) -> Tuple:
+    """
+    Find the (code, name, class) columns by header text, falling back to the
+    first three columns by position. With positional_fallback=False an
+    unrecognised column is returned as None instead.
+    """
+    # Strip each header once instead of once per key column
+    stripped = [(c, str(c).strip()) for c in columns]
+    code_col = next((c for c, text in stripped if text in CODE_HEADERS), None)
+    name_col = next((c for c, text in stripped if text in NAME_HEADERS), None)
+    class_col = next((c for c, text in stripped if text in CLASS_HEADERS), None)
+    if not positional_fallback:
+        return code_col, name_col, class_col
+    # Positional fallbacks are looked up lazily: columns[2] only has to
+    # exist when no class header was found
+    return (
+        columns[0] if code_col is None else code_col,
+        columns[1] if name_col is None else name_col,
+        columns[2] if class_col is None else class_col,
+    )
+
+
+def read_excel_columns(source, file_ext: str, detail_cols: List[str]) -> Tuple[pd.DataFrame, Tuple, list]:
+    """
+    Read only the code/name/class columns plus detail_cols (matched by header
+    text) instead of the whole sheet.
+    Returns (df, (code, name, class) labels, detail column labels). The key
+    columns are detected on the full header and must be passed on to
+    generate_pdf(key_cols=...): positional fallbacks would pick different
+    columns on the trimmed frame.
+    """
+    header = read_excel(source, file_ext, nrows=0).columns
+    by_text = {str(c).strip(): c for c in header}
+    missing = [n for n in detail_cols if n.strip() not in by_text]
+    if missing:
+        raise ValueError(f"Columns not found in the Excel sheet: {', '.join(missing)}")
+    details = [by_text[n.strip()] for n in detail_cols]
+    key_cols = detect_key_columns(header)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    # Positional usecols: label lists would be misread for numeric headers
+    wanted = {*key_cols, *details}
+    df = read_excel(source, file_ext, usecols=[i for i, c in enumerate(header) if c in wanted])
+    return df, key_cols, details
+
+
 def format_value(v):
     """
     Pretty-print cell values:
@@ -47,6 +143,11 @@ def format_value(v):
     """
     if pd.isna(v):
         return "-"
+    return _format_present(v)
+
+
+def _format_present(v):
+    """format_value for a cell already known not to be NA."""
     if isinstance(v, float):
         if abs(v - int(v)) < 1e-9:
             return str(int(v))
@@ -54,56 +155,173 @@ def format_value(v):
     return str(v)
 
 
-def split_columns_evenly(keys: List[str], values: List[str], max_items_each_col: int) -> Tuple[List[Tuple[str,str]], List[Tuple[str,str]], List[Tuple[str,str]]]:
+def format_column(s: pd.Series) -> np.ndarray:
+    """
+    Column-wise format_value. The NA mask comes from one isna() pass instead
+    of a pd.isna call per cell; float and integer columns are then formatted
+    with a few NumPy passes, text columns (string dtype, or object columns
+    holding only str) are used as-is, and anything else (which may hold mixed
+    Python objects) formats only its non-NA cells one by one.
+    """
+    nan_mask = s.isna().to_numpy()
+    if pd.api.types.is_float_dtype(s.dtype):
+        arr = s.to_numpy(dtype=float, na_value=np.nan)
+        filled = np.where(nan_mask, 0.0, arr)
+        whole = np.trunc(filled)
+        # Same integer test as format_value; values beyond int64 take the "%.2f"
+        # path, which prints the same digits once ".00" is stripped
+        is_int = (np.abs(filled - whole) < 1e-9) & (np.abs(whole) < 2.0 ** 63)
+        ints = np.where(is_int, whole, 0).astype(np.int64).astype(str)
+        decimals = np.char.rstrip(np.char.rstrip(np.char.mod("%.2f", filled), "0"), ".")
+        out = np.where(is_int, ints, decimals).astype(object)
+    elif pd.api.types.is_integer_dtype(s.dtype):
+        out = s.astype(str).to_numpy(dtype=object)
+    elif isinstance(s.dtype, pd.StringDtype) or (
+        s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) == "string"
+    ):
+        out = s.to_numpy(dtype=object, copy=True)
+    else:
+        values = s.to_numpy(dtype=object)
+        out = np.empty(len(values), dtype=object)
+        present = ~nan_mask
+        out[present] = [_format_present(v) for v in values[present]]
+    out[nan_mask] = "-"
+    return out
+
+
+def split_columns_evenly(items: Sequence[str], max_items_each_col: int) -> Tuple[Sequence[str], Sequence[str], Sequence[str]]:
     """
-    Split key/value pairs into two columns to keep cards compact.
+    Split card body items into three columns to keep cards compact.
     """
-    pairs = list(zip(keys, values))
-    left = pairs[:max_items_each_col]
-    middle = pairs[max_items_each_col: 2 * max_items_each_col]
-    right = pairs[2 * max_items_each_col:]
+    left = items[:max_items_each_col]
+    middle = items[max_items_each_col: 2 * max_items_each_col]
+    right = items[2 * max_items_each_col:]
     return left, middle, right
 
 
-def draw_card(
+class StateTrackingTextObject(textobject.PDFTextObject):
+    """
+    Text object that remembers the last fill color set through
+    setFillColorRGB, so StateCachingCanvas can account for it after drawText.
+    """
+
+    _fill_state = None
+
+    def setFillColorRGB(self, r, g, b, alpha=None):
+        super().setFillColorRGB(r, g, b, alpha)
+        self._fill_state = (r, g, b, alpha)
+
+
+class StateCachingCanvas(canvas.Canvas):
+    """
+    Canvas that skips setFont / setFillColorRGB / setStrokeColorRGB when the
+    requested value is already current, so consecutive cards don't re-emit
+    identical operators. The cache follows the PDF graphics state: it is
+    saved/restored with saveState/restoreState, dropped on showPage, and a
+    form gets its own while it is being recorded. Inside text objects only
+    setFont and setFillColorRGB are tracked.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._state_cache_stack = []
+        self._reset_state_cache()
+
+    def _reset_state_cache(self):
+        self._font_state = self._fill_state = self._stroke_state = None
+
+    def _push_state_cache(self):
+        self._state_cache_stack.append((self._font_state, self._fill_state, self._stroke_state))
+
+    def _pop_state_cache(self):
+        self._font_state, self._fill_state, self._stroke_state = self._state_cache_stack.pop()
+
+    def setFont(self, psfontname, size, leading=None):
+        if leading is None:
+            leading = size * 1.2
+        state = (psfontname, size, leading)
+        if state == self._font_state:
+            # nothing to emit, but keep the metrics attributes in sync
+            self._fontname, self._fontsize, self._leading = state
+            return
+        super().setFont(psfontname, size, leading)
+        self._font_state = state
+
+    def setFillColorRGB(self, r, g, b, alpha=None):
+        state = (r, g, b, alpha)
+        if state != self._fill_state:
+            super().setFillColorRGB(r, g, b, alpha)
+            self._fill_state = state
+
+    def setStrokeColorRGB(self, r, g, b, alpha=None):
+        state = (r, g, b, alpha)
+        if state != self._stroke_state:
+            super().setStrokeColorRGB(r, g, b, alpha)
+            self._stroke_state = state
+
+    def beginText(self, x=0, y=0, direction=None):
+        return StateTrackingTextObject(self, x, y, direction=direction)
+
+    def drawText(self, aTextObject):
+        super().drawText(aTextObject)
+        # Tf and colors set inside a text object stay in effect after ET
+        self._font_state = (aTextObject._fontname, aTextObject._fontsize, aTextObject._leading)
+        fill_state = getattr(aTextObject, "_fill_state", None)
+        if fill_state is not None:
+            self._fill_state = fill_state
+
+    def saveState(self):
+        super().saveState()
+        self._push_state_cache()
+
+    def restoreState(self):
+        super().restoreState()
+        self._pop_state_cache()
+
+    def showPage(self):
+        super().showPage()
+        self._reset_state_cache()
+
+    def beginForm(self, *args, **kwargs):
+        super().beginForm(*args, **kwargs)
+        self._push_state_cache()
+        self._reset_state_cache()
+
+    def endForm(self, **extra_attributes):
+        super().endForm(**extra_attributes)
+        self._pop_state_cache()
+
+
+# Padding between the card border and its content
+CARD_INNER_MARGIN = 10
+
+
+def draw_card_frame(
     c: canvas.Canvas,
     x: float,
     y: float,
     w: float,
     h: float,
-    name: str,
-    class_: str,
-    code: str,
-    kv_left: List[Tuple[str, str]],
-    kv_middle: List[Tuple[str, str]],
-    kv_right: List[Tuple[str, str]],
     font: str,
     card_title: str = "",
     title_font_size: int = 14,
     card_title_font_size: int = 12,
-    body_font_size: int = 10,
     corner_radius: int = 10,
 ):
     """
-    Draw a single rounded-rectangle card with a title and two-column key:value body.
-    (0,0) is the bottom-left of the page. Card's anchor point is bottom-left at (x, y).
+    Draw the parts of a card that are the same for every student: the
+    rounded-rectangle background, the card title (top-right) and the divider
+    under the title row. Card's anchor point is bottom-left at (x, y).
     """
-    # Card background
-    c.saveState()
+    inner_margin = CARD_INNER_MARGIN
+    title_y = y + h - inner_margin - title_font_size
+
+    # Background
     c.setLineWidth(1)
     c.setStrokeColorRGB(0.25, 0.35, 0.55)
     c.setFillColorRGB(0.97, 0.98, 1.0)
-    # Rounded rectangle path
     c.roundRect(x, y, w, h, corner_radius, stroke=1, fill=1)
 
-    inner_margin = 10
-    title_y = y + h - inner_margin - title_font_size
-
-    # Title (student name, clsss and code) - left side
-    c.setFont(font, title_font_size)
-    c.setFillColorRGB(0.12, 0.18, 0.35)
-    c.drawString(x + inner_margin, title_y, f"{name} {code}")
-
     # Card title - right side, smaller font
     if card_title:
         c.setFont(font, card_title_font_size)
@@ -115,46 +333,100 @@ def draw_card(
     c.setStrokeColorRGB(0.75, 0.8, 0.95)
     c.line(x + inner_margin, title_y - 4, x + w - inner_margin, title_y - 4)
 
-    # Body text
-    c.setFont(font, body_font_size)
-    c.setFillColorRGB(0.1, 0.1, 0.1)
 
-    # Two columns area
+def define_card_frame_form(c: canvas.Canvas, name: str, w: float, h: float, **frame_kwargs):
+    """
+    Record draw_card_frame once as a form XObject (in card-local coordinates)
+    so every card can reference it with draw_card(frame_form=name).
+    frame_kwargs are passed on to draw_card_frame.
+    """
+    # bbox leaves room for the half of the 1pt border that lies outside the card
+    c.beginForm(name, -1, -1, w + 1, h + 1)
+    draw_card_frame(c, 0, 0, w, h, **frame_kwargs)
+    c.endForm()
+
+
+def draw_card(
+    c: canvas.Canvas,
+    x: float,
+    y: float,
+    w: float,
+    h: float,
+    heading: str,
+    kv_left: Iterable[Tuple[str, str]],
+    kv_middle: Iterable[Tuple[str, str]],
+    kv_right: Iterable[Tuple[str, str]],
+    font: str,
+    card_title: str = "",
+    title_font_size: int = 14,
+    card_title_font_size: int = 12,
+    body_font_size: int = 10,
+    corner_radius: int = 10,
+    frame_form: str = None,
+):
+    """
+    Draw a single rounded-rectangle card with a title and three-column key:value body.
+    heading is the student's "name code" line shown top-left.
+    kv_* hold (prefix, value) pairs where prefix is the preformatted "key: ".
+    frame_form names a form from define_card_frame_form (built with the same
+    sizes and card_title) to stamp instead of drawing the static parts again.
+    (0,0) is the bottom-left of the page. Card's anchor point is bottom-left at (x, y).
+    """
+    # Static parts. No saveState/restoreState around the rest of the card:
+    # every font/color used below is set explicitly, and leaving them in place
+    # lets StateCachingCanvas skip the unchanged ones on the next card
+    if frame_form:
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(frame_form)
+        c.restoreState()
+    else:
+        draw_card_frame(c, x, y, w, h, font, card_title, title_font_size, card_title_font_size, corner_radius)
+
+    inner_margin = CARD_INNER_MARGIN
+    title_y = y + h - inner_margin - title_font_size
+
+    # Three columns area
     body_top = title_y - 20
     line_height = body_font_size + 4
     col_gap = 8
     col_w = (w - inner_margin * 2 - col_gap * 2) / 3
+    middle_x = x + inner_margin + col_w + col_gap
+    right_x = middle_x + col_w + col_gap
 
-    # Left column
-    cur_y = body_top
-    for k, v in kv_left:
-        text = f"{k}: {v}"
-        c.drawString(x + inner_margin, cur_y, text)
-        cur_y -= line_height
-
+    # All of the card's variable text goes into one text object (a single
+    # BT...ET block) instead of a drawString per line; ReportLab still takes
+    # care of escaping and TTF subset encoding.
+    # Title (student name and code) - left side
+    c.setFillColorRGB(0.12, 0.18, 0.35)
+    text = c.beginText(x + inner_margin, title_y)
+    text.setFont(font, title_font_size)
+    text.textOut(heading)
 
-    # Middle column
-    cur_y = body_top
-    right_x = x + inner_margin + col_w + col_gap
-    for k, v in kv_middle:
-        text = f"{k}: {v}"
-        c.drawString(right_x, cur_y, text)
-        cur_y -= line_height
+    # Body text
+    text.setFont(font, body_font_size, line_height)
+    text.setFillColorRGB(0.1, 0.1, 0.1)
+    for col_x, kv in ((x + inner_margin, kv_left), (middle_x, kv_middle), (right_x, kv_right)):
+        lines = [prefix + v for prefix, v in kv]
+        if lines:
+            text.setTextOrigin(col_x, body_top)
+            text.textLines(lines)  # list form: lines are not stripped
+    c.drawText(text)
 
-    # Right column
-    cur_y = body_top
-    right_x = right_x + col_w + col_gap
-    for k, v in kv_right:
-        text = f"{k}: {v}"
-        c.drawString(right_x, cur_y, text)
-        cur_y -= line_height
 
-    c.restoreState()
+def draw_page_header(c: canvas.Canvas, font: str, text: str, x: float, y: float):
+    """
+    Draw the page header line. No saveState/restoreState: graphics state
+    starts fresh on every page and draw_card sets every font/color it uses.
+    """
+    c.setFont(font, 12)
+    c.setFillColorRGB(0.15, 0.15, 0.15)
+    c.drawString(x, y, text)
 
 
 def generate_pdf(
     df: pd.DataFrame,
-    output_path: str,
+    output_path: Union[str, BinaryIO],
     font_path: str = "./simsun.ttc",
     title: str = "学生成绩小分条",
     card_title: str = "期中英语",
@@ -169,14 +441,15 @@ def generate_pdf(
     body_font_size: int = 8,
     detail_cols: list = None,
     preview_only: bool = False,
-    max_preview_cards: int = None
+    max_preview_cards: int = None,
+    key_cols: tuple = None
 ):
     """
     Generate PDF from DataFrame.
 
     Args:
         df: DataFrame containing student data
-        output_path: Output PDF file path
+        output_path: Output PDF file path or writable binary stream (e.g. BytesIO)
         font_path: Path to TTF/TTC font file
         title: Document title
         card_title: Title shown on each card
@@ -192,6 +465,7 @@ def generate_pdf(
         detail_cols: List of columns to display (if None, auto-detect)
         preview_only: If True, only render first page with suffix
         max_preview_cards: Maximum cards to render for preview
+        key_cols: (code, name, class) column labels (if None, auto-detect)
 
     Returns:
         None
@@ -207,21 +481,16 @@ def generate_pdf(
     font_name = try_register_font(font_path)
 
     # Find name, code, and class columns
-    code_col_candidates = [c for c in df.columns if str(c).strip() in ("学号", "学号/Code", "code", "Code")]
-    code_col = code_col_candidates[0] if code_col_candidates else df.columns[0]
-
-    name_col_candidates = [c for c in df.columns if str(c).strip() in ("姓名", "姓名/Name", "name", "Name")]
-    name_col = name_col_candidates[0] if name_col_candidates else df.columns[1]
-
-    class_col_candidates = [c for c in df.columns if str(c).strip() in ("班级", "班级/Class", "class", "Class")]
-    class_col = class_col_candidates[0] if class_col_candidates else df.columns[2]
+    code_col, name_col, class_col = key_cols if key_cols else detect_key_columns(df.columns)
 
     # Auto-detect detail columns if not provided
     if detail_cols is None:
         detail_cols = [cn for cn in df.columns if (not isinstance(cn, str)) or (cn != name_col and cn != code_col and cn != class_col)]
 
     # Canvas
-    c = canvas.Canvas(output_path, pagesize=(page_w, page_h))
+    # initialFontName: with the default (Helvetica) every page would start with
+    # a Helvetica Tf and the PDF would carry an unused Helvetica font object
+    c = StateCachingCanvas(output_path, pagesize=(page_w, page_h), pageCompression=1, initialFontName=font_name)
     c.setTitle(title)
 
     # Calculate card dimensions
@@ -233,47 +502,71 @@ def generate_pdf(
     actual_rows = min(rows, max_rows_fit)
     cards_per_page = cols * actual_rows
 
-    # Page header function
-    def draw_header(page_idx: int):
-        c.saveState()
-        c.setFont(font_name, 12)
-        c.setFillColorRGB(0.15, 0.15, 0.15)
-        header_y = page_h - margin + 10
-        suffix = " (预览)" if preview_only else ""
-        c.drawString(margin, header_y, f"{title}  —  Page {page_idx}{suffix}")
-        c.restoreState()
+    # Bottom-left (x, y) of every card slot on a page, in fill order
+    top_area = page_h - margin - card_h
+    slot_xy = [
+        (margin + (i % cols) * (card_w + gutter), top_area - (i // cols) * (card_h + gutter))
+        for i in range(cards_per_page)
+    ]
+
+    # Static card parts, stored once in the PDF and referenced by every card
+    define_card_frame_form(
+        c,
+        "card_frame",
+        card_w,
+        card_h,
+        font=font_name,
+        card_title=card_title,
+        title_font_size=title_font_size,
+        card_title_font_size=card_title_font_size,
+        corner_radius=10,
+    )
+
+    # Page header: only the page number changes between pages
+    header_y = page_h - margin + 10
+    header_prefix = f"{title}  —  Page "
+    header_suffix = " (预览)" if preview_only else ""
 
     page_idx = 1
-    draw_header(page_idx)
+    draw_page_header(c, font_name, header_prefix + str(page_idx) + header_suffix, margin, header_y)
 
     # Estimate lines per column
     line_height = body_font_size + 4
     approx_lines_body = int((card_h - 36) // line_height)
     max_each_col = max(1, approx_lines_body)
 
-    # Determine how many cards to render
-    total_cards = len(df)
-    if preview_only and max_preview_cards:
-        total_cards = min(total_cards, max_preview_cards)
+    # "key: " labels are the same on every card; build and split them once
+    key_prefixes = [f"{k}: " for k in detail_cols]
+    left_keys, middle_keys, right_keys = split_columns_evenly(key_prefixes, max_each_col)
 
-    card_count_on_page = 0
-
-    for idx in range(total_cards):
-        row = df.iloc[idx]
-        name = format_value(row[name_col])
-        code = format_value(row[code_col])
-        class_ = format_value(row[class_col]) if class_col in df.columns else ""
-
-        values = [format_value(row[col]) for col in detail_cols]
-        left, middle, right = split_columns_evenly(detail_cols, values, max_each_col)
-
-        pos_in_page = card_count_on_page % cards_per_page
-        r = pos_in_page // cols
-        c_in_row = pos_in_page % cols
+    # Determine how many cards to render. A preview is a single page, so it
+    # never needs more than one page of cards (extra ones would only be
+    # drawn over the first slots)
+    total_cards = len(df)
+    if preview_only:
+        total_cards = min(total_cards, cards_per_page)
+        if max_preview_cards:
+            total_cards = min(total_cards, max_preview_cards)
+
+    # Format every needed cell up front, one column at a time, into plain
+    # Python lists; the loop then zips them row-wise, so no Series (df.iloc)
+    # or NumPy row view is built per card. The class column is not drawn.
+    cells = df[[name_col, code_col] + list(detail_cols)].iloc[:total_cards]
+    columns = [format_column(cells.iloc[:, j]).tolist() for j in range(cells.shape[1])]
+    headings = [name + " " + code for name, code in zip(columns[0], columns[1])]
+
+    for idx, (heading, *values) in enumerate(zip(headings, *columns[2:])):
+        # Layout is fully precomputed: the slot index picks the position, and
+        # slot 0 of every page after the first starts a new page (the preview
+        # is a single page)
+        slot = idx % cards_per_page
+        if slot == 0 and idx and not preview_only:
+            c.showPage()
+            page_idx += 1
+            draw_page_header(c, font_name, header_prefix + str(page_idx) + header_suffix, margin, header_y)
+        x, y = slot_xy[slot]
 
-        x = margin + c_in_row * (card_w + gutter)
-        top_area = page_h - margin - card_h
-        y = top_area - r * (card_h + gutter)
+        left, middle, right = split_columns_evenly(values, max_each_col)
 
         draw_card(
             c,
@@ -281,34 +574,25 @@ def generate_pdf(
             y,
             card_w,
             card_h,
-            name=name,
-            class_=class_,
-            code=code,
-            kv_left=left,
-            kv_middle=middle,
-            kv_right=right,
+            heading=heading,
+            kv_left=zip(left_keys, left),
+            kv_middle=zip(middle_keys, middle),
+            kv_right=zip(right_keys, right),
             font=font_name,
             card_title=card_title,
             title_font_size=title_font_size,
             card_title_font_size=card_title_font_size,
             body_font_size=body_font_size,
             corner_radius=10,
+            frame_form="card_frame",
         )
 
-        card_count_on_page += 1
-
-        # Page break (only if not preview or not last card)
-        if not preview_only and (card_count_on_page % cards_per_page) == 0 and idx != total_cards - 1:
-            c.showPage()
-            page_idx += 1
-            draw_header(page_idx)
-
     c.save()
 
 
 def main():
     parser = argparse.ArgumentParser(description="Generate student strips (cards) PDF from Excel.")
-    parser.add_argument("--excel", required=True, help="Path to input .xlsx file (first sheet used).")
+    parser.add_argument("--excel", required=True, help="Path to input .xlsx/.xls file (first sheet used). Install python-calamine for much faster reading of large sheets.")
     parser.add_argument("--pdf", required=True, help="Output PDF path.")
     parser.add_argument("--font", default="./simsun.ttc", help="Path to a TTF font that supports Chinese (e.g., SimHei/SourceHanSans).")
     parser.add_argument("--title", default="学生成绩小分条", help="Optional document title to place on the first page header.")
@@ -322,18 +606,20 @@ def main():
     parser.add_argument("--title_font_size", type=int, default=10, help="Font size for student name/code in card title.")
     parser.add_argument("--card_title_font_size", type=int, default=8, help="Font size for card title (top-right corner).")
     parser.add_argument("--body_font_size", type=int, default=8, help="Font size for card body text.")
+    parser.add_argument("--detail_cols", nargs="+", default=None, help="Columns to show on each card (default: all except name/code/class). Only these columns are read from the sheet.")
     args = parser.parse_args()
 
 
     # Read Excel - automatically detect engine based on file extension
     file_ext = os.path.splitext(args.excel)[1].lower()
-    if file_ext == '.xls':
-        df = pd.read_excel(args.excel, engine="xlrd")
-    elif file_ext == '.xlsx':
-        df = pd.read_excel(args.excel, engine="openpyxl")
+    key_cols = detail_cols = None  # Auto-detect
+    if args.detail_cols:
+        try:
+            df, key_cols, detail_cols = read_excel_columns(args.excel, file_ext, args.detail_cols)
+        except ValueError as e:
+            parser.error(str(e))
     else:
-        # Try openpyxl as default
-        df = pd.read_excel(args.excel, engine="openpyxl")
+        df = read_excel(args.excel, file_ext)
 
     if df.empty:
         raise ValueError("The Excel sheet is empty.")
@@ -354,7 +640,8 @@ def main():
         title_font_size=args.title_font_size,
         card_title_font_size=args.card_title_font_size,
         body_font_size=args.body_font_size,
-        detail_cols=None,  # Auto-detect
+        detail_cols=detail_cols,
+        key_cols=key_cols,
         preview_only=False,
         max_preview_cards=None
     )
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the worksheet cell layout in generator.
+
+Run with:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from io import BytesIO
+
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+from reportlab.platypus.frames import Frame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generator as gen  # noqa: E402
+
+
+def _flows(items, size=11):
+    header_style, body_style = gen._styles(size)
+    header = "<b>" + gen.wrap_mixed("2024-05-01 Unit 1 Name____ Class____",
+                                     en_font=gen.EN_FONT_BOLD) + "</b>"
+    flows = [Paragraph(header, header_style)]
+    for i, t in enumerate(items, 1):
+        flows.append(Paragraph(gen.wrap_mixed(f"{i}. {t}"), body_style))
+    return flows
+
+
+def _frame_offsets(flows, width, height):
+    """Let a real Frame place the flowables and return (index, offset) pairs."""
+    drawn = []
+    for i, f in enumerate(flows):
+        def record(canv, x, y, _sW=0, _i=i):
+            drawn.append((_i, y))
+        f.drawOn = record
+    frame = Frame(0, 0, width, height)
+    frame.addFromList(list(flows), canvas.Canvas(BytesIO()))
+    top = height - gen.FRAME_PADDING
+    return [(i, top - y) for i, y in drawn]
+
+
+class LayoutFlowablesMatchesFrameTest(unittest.TestCase):
+    """layout_flowables must put each paragraph where Frame.addFromList would."""
+
+    CASES = {
+        "short": ["apple", "banana", "苹果"],
+        "wrapping": ["a fairly long English sentence that has to wrap inside the cell " * 2,
+                     "一个需要在单元格里换行的很长的中文句子，" * 4,
+                     "mixed 中英文 text 混排"] * 2,
+        "overflow": ["item %d 词语" % n for n in range(60)],
+    }
+
+    def test_offsets_match_frame(self):
+        width, height = 280.0, 260.0
+        for name, items in self.CASES.items():
+            with self.subTest(case=name):
+                expected = _frame_offsets(_flows(items), width, height)
+                flows = _flows(items)
+                placed = gen.layout_flowables(
+                    flows, width - 2 * gen.FRAME_PADDING, height - 2 * gen.FRAME_PADDING)
+                got = [(flows.index(f), offset) for f, offset in placed]
+                self.assertEqual(len(got), len(expected))
+                for (gi, go), (ei, eo) in zip(got, expected):
+                    self.assertEqual(gi, ei)
+                    self.assertAlmostEqual(go, eo, places=6)
+
+    def test_overflow_case_is_truncated(self):
+        flows = _flows(self.CASES["overflow"])
+        placed = gen.layout_flowables(flows, 268.0, 248.0)
+        self.assertLess(len(placed), len(flows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for student_grades_generator column handling.
+
+Run with:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import student_grades_generator as sg  # noqa: E402
+
+
+def _xlsx(df: pd.DataFrame) -> BytesIO:
+    buf = BytesIO()
+    df.to_excel(buf, index=False)
+    buf.seek(0)
+    return buf
+
+
+def _baseline_format_value(v):
+    """The original per-cell formatter, kept verbatim as the reference."""
+    if pd.isna(v):
+        return "-"
+    if isinstance(v, float):
+        if abs(v - int(v)) < 1e-9:
+            return str(int(v))
+        return f"{v:.2f}".rstrip("0").rstrip(".")
+    return str(v)
+
+
+class FormatColumnMatchesBaselineTest(unittest.TestCase):
+    """format_column must print every dtype exactly like the old per-row loop."""
+
+    CASES = {
+        # vectorized float path: NaN, integral floats, rounding, huge values
+        "float": pd.Series([95.0, 87.5, np.nan, -3.0, 0.125, 1e20, 2.0 ** 63, -0.004]),
+        "float_all_nan": pd.Series([np.nan, np.nan]),
+        "Float64": pd.Series([1.0, None, 2.25], dtype="Float64"),
+        # integer astype(str) path
+        "int": pd.Series([250101, 0, -7]),
+        "Int64": pd.Series([1, None, 3], dtype="Int64"),
+        "uint64": pd.Series([2 ** 64 - 1, 5], dtype="uint64"),
+        # string fast path
+        "object_str": pd.Series([" a ", "", "  ", "张三", None], dtype=object),
+        "string": pd.Series(["x", None, " y"], dtype="string"),
+        "str": pd.Series(["x", np.nan, "转学"]).astype("str"),
+        # per-cell fallback
+        "object_mixed": pd.Series(["90", 4.0, 88.5, 7, None, np.nan, True], dtype=object),
+        "category": pd.Series(["A", "B", None, "A"], dtype="category"),
+        "bool": pd.Series([True, False]),
+        "boolean": pd.Series([True, None], dtype="boolean"),
+        "datetime": pd.Series(pd.to_datetime(["2024-05-01", None])),
+        "empty": pd.Series([], dtype=float),
+    }
+
+    def test_matches_per_row_formatting(self):
+        for name, s in self.CASES.items():
+            with self.subTest(dtype=name):
+                # The baseline read each cell as row[col] from df.iloc[idx]
+                df = pd.DataFrame({"c": s})
+                expected = [_baseline_format_value(df.iloc[i]["c"]) for i in range(len(df))]
+                got = sg.format_column(s)
+                self.assertEqual(got.dtype, object)
+                self.assertEqual(list(got), expected)
+
+    def test_format_value_matches_baseline(self):
+        for name, s in self.CASES.items():
+            with self.subTest(dtype=name):
+                self.assertEqual([sg.format_value(v) for v in s.astype(object)],
+                                 [_baseline_format_value(v) for v in s.astype(object)])
+
+
+class ReadExcelColumnsNoClassHeaderTest(unittest.TestCase):
+    """A sheet without a class header: the class slot falls back by position."""
+
+    def setUp(self):
+        self.sheet = pd.DataFrame({
+            "学号": [250101, 250102],
+            "备注": ["", "转学"],
+            "姓名": ["张三", "李四"],
+            "听力": [95, 88],
+        })
+
+    def test_key_columns_come_from_full_header(self):
+        df, key_cols, details = sg.read_excel_columns(_xlsx(self.sheet), ".xlsx", ["听力"])
+        self.assertEqual(key_cols, sg.detect_key_columns(self.sheet.columns))
+        self.assertEqual(key_cols, ("学号", "姓名", "姓名"))
+        self.assertEqual(details, ["听力"])
+        self.assertEqual(list(df.columns), ["学号", "姓名", "听力"])
+
+    def test_pdf_uses_full_header_key_columns(self):
+        df, key_cols, details = sg.read_excel_columns(_xlsx(self.sheet), ".xlsx", ["听力"])
+        out = BytesIO()
+        sg.generate_pdf(df, out, font_path="", detail_cols=details, key_cols=key_cols)
+        full = BytesIO()
+        sg.generate_pdf(self.sheet, full, font_path="", detail_cols=["听力"])
+        self.assertTrue(out.getvalue().startswith(b"%PDF"))
+
+        try:
+            import fitz
+        except ImportError:
+            return
+        text = fitz.open(stream=out.getvalue(), filetype="pdf")[0].get_text()
+        full_text = fitz.open(stream=full.getvalue(), filetype="pdf")[0].get_text()
+        self.assertEqual(text, full_text)
+
+    def test_missing_column_is_reported(self):
+        with self.assertRaises(ValueError):
+            sg.read_excel_columns(_xlsx(self.sheet), ".xlsx", ["口语"])
+
+
+if __name__ == "__main__":
+    unittest.main()